@@ -5,21 +5,25 @@
 import asyncio
 from typing import List, Dict
 
-from multiworker.client import create_client_no_timeout
+from multiworker.client import close_client
+from multiworker.openai_calls import close_cache
 from multiworker.settings_menu import settings_menu
-from multiworker.sessions import list_sessions, save_session, load_session, slug
+from multiworker.sessions import list_sessions, asave_session, aload_session, slug
 from multiworker.orchestrator import run_turn
-from multiworker.ui import console
+from multiworker.ui import console, ainput
+from multiworker.logging_trace import flush_pending_traces
 from multiworker import config
 
-def main():
-    client = create_client_no_timeout()
+async def repl():
     history: List[Dict[str, str]] = []
 
     console.print("[bold]Multi-Worker Orchestrator[/bold] — commands: /list, /save <n>, /load <n>, /clear, /settings, /exit")
 
     while True:
-        user_in = input("\nYou: ").strip()
+        user_in = await ainput("\nYou: ")
+        if user_in is None:  # EOF (Ctrl-D)
+            break
+        user_in = user_in.strip()
         if not user_in:
             continue
 
@@ -27,15 +31,13 @@ def main():
             break
 
         if user_in.startswith("/settings"):
-            settings_menu()
+            await settings_menu()
             continue
 
         if user_in.startswith("/clear"):
             history = []
-            # reset running token totals
-            config.RUNNING_TOKENS["input"] = 0
-            config.RUNNING_TOKENS["output"] = 0
-            config.RUNNING_TOKENS["total"] = 0
+            config.set_running_tokens()
+            config.new_session_id()
             console.print("[yellow]Context cleared and token counters reset.[/yellow]")
             continue
 
@@ -52,7 +54,7 @@ def main():
             if len(parts) < 2:
                 console.print("[red]Usage: /save <name>[/red]")
                 continue
-            path = save_session(parts[1], history, config.RUNNING_TOKENS)
+            path = await asave_session(parts[1], history, config.RUNNING_TOKENS)
             console.print(f"[green]Saved[/green] → {path}")
             continue
 
@@ -61,16 +63,15 @@ def main():
             if len(parts) < 2:
                 console.print("[red]Usage: /load <name>[/red]")
                 continue
-            loaded = load_session(parts[1])
+            loaded = await aload_session(parts[1])
             if loaded is None:
                 console.print("[red]Not found.[/red]")
                 continue
             msgs, tokens = loaded
             history = msgs
             # restore running token totals from session file
-            config.RUNNING_TOKENS["input"] = tokens.get("input", 0)
-            config.RUNNING_TOKENS["output"] = tokens.get("output", 0)
-            config.RUNNING_TOKENS["total"] = tokens.get("total", 0)
+            config.set_running_tokens(tokens)
+            config.new_session_id()
             console.print(f"[green]Loaded[/green] session '{slug(parts[1])}' "
                           f"with {len(history)} messages. "
                           f"Tokens so far: in={config.RUNNING_TOKENS['input']} "
@@ -79,11 +80,44 @@ def main():
             continue
 
         history.append({"role": "user", "content": user_in})
-        final_answer = asyncio.run(run_turn(client, history))
-        print(final_answer)
-        history.append({"role": "assistant", "content": final_answer})
+        final_answer = await run_turn(None, history)  # shared client; prints/streams the answer
+        if final_answer:
+            history.append({"role": "assistant", "content": final_answer})
+        else:
+            # Failed turn with nothing shown: don't keep an unanswered message in the context
+            history.pop()
+            console.print("[dim]No answer; the message was not added to the conversation.[/dim]")
 
+async def repl_main():
+    # One event loop and one client for the whole session, so pooled keep-alive
+    # connections survive across turns; close them (and the response cache's
+    # database) cleanly on the way out. The client is created on the first chat
+    # turn (see get_client)
+    try:
+        await repl()
+    finally:
+        await flush_pending_traces()
+        await close_client()
+        close_cache()
     console.print("[dim]Bye.[/dim]")
 
+def _run(coro):
+    """Run on uvloop (winloop on Windows) when installed, else the stdlib event loop."""
+    try:
+        import uvloop as fast_loop
+    except ImportError:
+        try:
+            import winloop as fast_loop
+        except ImportError:
+            return asyncio.run(coro)
+    run = getattr(fast_loop, "run", None)
+    if run is None:  # releases before .run(): install the loop policy instead
+        fast_loop.install()
+        return asyncio.run(coro)
+    return run(coro)
+
+def main():
+    _run(repl_main())
+
 if __name__ == "__main__":
     main()
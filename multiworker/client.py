@@ -1,18 +1,70 @@
 # File: multiworker/client.py
+import importlib.util
 import os
-from openai import AsyncOpenAI
+from typing import TYPE_CHECKING, Optional
 
-def create_client_no_timeout() -> AsyncOpenAI:
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Created on first use so commands that never hit the network don't pay for importing openai
+_CLIENT: Optional["AsyncOpenAI"] = None
+
+# Fail fast on unreachable hosts, but never cut off a long reasoning response
+CONNECT_TIMEOUT_SEC = 10.0
+
+def _timeout():
+    from openai import Timeout   # the SDK's own httpx Timeout type
+    return Timeout(None, connect=CONNECT_TIMEOUT_SEC)
+
+def _pooled_http_client():
+    """
+    Keep-alive pool shared by every call of the session, sized for the worker
+    fan-out so concurrent requests reuse warm connections instead of handshaking.
+    Uses HTTP/2 (one multiplexed connection) when the optional `h2` package is installed.
+    """
+    import httpx
+    from openai import DefaultAsyncHttpxClient
+
+    return DefaultAsyncHttpxClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=_timeout(),
+        limits=httpx.Limits(max_keepalive_connections=16, max_connections=64, keepalive_expiry=60.0),
+    )
+
+def create_client_no_timeout() -> "AsyncOpenAI":
     """
-    Create an AsyncOpenAI client with no HTTP timeout if supported by the SDK,
-    otherwise fall back to an httpx client with timeout disabled.
+    Create an AsyncOpenAI client with no read timeout (only a connect timeout) on a
+    tuned connection pool. Falls back to the SDK's own client (or a plain httpx
+    client with timeout disabled) on older SDKs.
     """
+    from openai import AsyncOpenAI
+
+    api_key = os.environ.get("OPENAI_API_KEY")
     try:
-        return AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"), timeout=None)
+        # The client-level timeout is applied per request, so it must match the pool's
+        return AsyncOpenAI(api_key=api_key, timeout=_timeout(), http_client=_pooled_http_client())
+    except (ImportError, TypeError):
+        pass
+    try:
+        return AsyncOpenAI(api_key=api_key, timeout=None)
     except TypeError:
         try:
             import httpx
             http_client = httpx.AsyncClient(timeout=None)
-            return AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"), http_client=http_client)
+            return AsyncOpenAI(api_key=api_key, http_client=http_client)
         except Exception:
-            return AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+            return AsyncOpenAI(api_key=api_key)
+
+def get_client() -> "AsyncOpenAI":
+    """Shared client for the session, created on first use."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = create_client_no_timeout()
+    return _CLIENT
+
+async def close_client() -> None:
+    """Close the shared client if it was ever created."""
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.close()
+        _CLIENT = None
@@ -1,6 +1,14 @@
 # File: multiworker/config.py
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
 import json
+import uuid
+
+try:
+    import orjson  # optional; same fast path as sessions.py
+except ImportError:
+    orjson = None
 
 # ------------------ Paths ------------------
 SETTINGS_PATH = Path("settings.json")
@@ -18,14 +26,60 @@ TEXT_VERBOSITY: str = "low"                       # keep concise; not exposed in
 N_WORKERS: int = 4
 WORKER_NAMES = [f"Worker-{i+1}" for i in range(N_WORKERS)]
 
-# Retry policy
+# Sample each worker independently. When off, identical worker requests are
+# coalesced into one API call and synthesis is skipped for a single distinct draft.
+WORKER_DIVERSITY: bool = True
+
+# Start the synthesizer once this many drafts are in (0 = wait for all). Stragglers'
+# requests are cancelled (the API reports no usage for them, so their partial tokens
+# aren't counted), or with SYNTH_CANCEL_STRAGGLERS off, finish after the answer is
+# shown (their drafts go to the trace and their tokens are counted)
+SYNTH_QUORUM: int = 0
+SYNTH_CANCEL_STRAGGLERS: bool = True
+
+# When waiting for all workers (3+), start synthesizing once all but the slowest are in;
+# restart with the full set only if the last draft is materially different. Costs an
+# extra synth call on restarts.
+SPECULATIVE_SYNTH: bool = False
+
+# Retry policy: exponential backoff with jitter from RETRY_DELAY_SEC up to RETRY_DELAY_CAP_SEC.
+# ATTEMPT_TIMEOUT_SEC bounds each attempt (0 = no limit); keep it generous, high
+# reasoning effort can legitimately take minutes.
 RETRY_MAX: int = 5
 RETRY_DELAY_SEC: int = 5
+RETRY_DELAY_CAP_SEC: int = 30
+ATTEMPT_TIMEOUT_SEC: int = 600
+
+# Client-side rate limiting (0 = no limit); retries re-acquire a slot
+MAX_CONCURRENCY: int = 8
+RATE_LIMIT_RPM: int = 0
+RATE_LIMIT_TPM: int = 0
+
+# History compaction (0 = send the full history every turn). Beyond this many turns,
+# older turns are replaced by one summary written by SUMMARY_MODEL.
+HISTORY_MAX_TURNS: int = 0
+SUMMARY_MODEL: str = "gpt-5-nano"
 
 # Logging
 LOG_ALL_TO_FILE: bool = False
 
+# Replay identical requests from an on-disk cache (exact match on model, instructions,
+# input, reasoning and text settings; entries expire after CACHE_TTL_SEC)
+CACHE_ENABLED: bool = False
+CACHE_DIR = SESS_DIR / ".cache"
+CACHE_TTL_SEC: int = 7 * 24 * 3600
+
+# Conversation id: sent as prompt_cache_key so the API routes this conversation's
+# requests to the same prompt-cache shard. Renewed on /clear and /load.
+SESSION_ID: str = uuid.uuid4().hex
+
+def new_session_id() -> str:
+    global SESSION_ID
+    SESSION_ID = uuid.uuid4().hex
+    return SESSION_ID
+
 # Running token totals (accumulate across turns; persisted in session files via /save)
+TOKEN_KEYS = ("input", "output", "total")
 RUNNING_TOKENS: dict = {"input": 0, "output": 0, "total": 0}
 
 # ------------------ System instructions ------------------
@@ -35,17 +89,40 @@ WORKER_INSTRUCTION = (
     "No preamble; focus on the solution."
 )
 SYNTH_INSTRUCTION = (
-    "You are the Synthesizer. Read the chat so far and the four Worker drafts. "
+    "You are the Synthesizer. Read the chat so far and the Worker drafts. "
     "Merge the best ideas, resolve conflicts, and produce ONE polished answer. "
     "Be decisive, accurate, and concise. Output only the final answer—no preamble."
 )
+SUMMARY_INSTRUCTION = (
+    "Summarize the conversation below so it can replace the original turns as context. "
+    "Keep facts, decisions, constraints, open questions and any code or data the user gave. "
+    "Be compact; no preamble."
+)
 
-# ------------------ Helpers ------------------
-def reasoning_dict():
-    return {"effort": REASONING_LEVEL}
+# ------------------ Request params ------------------
+# Shared by every API call instead of allocating fresh dicts per request. Read-only
+# views, rebound by refresh_request_params() whenever a setting changes, so a request
+# can never alter them and identical settings always produce identical payloads.
+REASONING_PARAMS: Mapping[str, str] = MappingProxyType({"effort": REASONING_LEVEL})
+TEXT_PARAMS: Mapping[str, str] = MappingProxyType({"verbosity": TEXT_VERBOSITY})
 
-def text_dict():
-    return {"verbosity": TEXT_VERBOSITY}
+def refresh_request_params() -> None:
+    """Rebuild REASONING_PARAMS / TEXT_PARAMS from the current settings."""
+    global REASONING_PARAMS, TEXT_PARAMS
+    REASONING_PARAMS = MappingProxyType({"effort": REASONING_LEVEL})
+    TEXT_PARAMS = MappingProxyType({"verbosity": TEXT_VERBOSITY})
+
+# ------------------ Token accounting ------------------
+def add_tokens(dst: dict, usage: dict) -> None:
+    """Accumulate a usage dict ({"input", "output", "total"}) into dst in place."""
+    for k in TOKEN_KEYS:
+        dst[k] = int(dst.get(k, 0)) + int(usage.get(k, 0) or 0)
+
+def set_running_tokens(tokens: dict | None = None) -> None:
+    """Reset RUNNING_TOKENS (no argument) or restore them from a saved session."""
+    tokens = tokens or {}
+    for k in TOKEN_KEYS:
+        RUNNING_TOKENS[k] = int(tokens.get(k, 0) or 0)
 
 # ------------------ Persistence (settings.json) ------------------
 def _validate_settings(data: dict) -> dict:
@@ -71,6 +148,13 @@ def _validate_settings(data: dict) -> dict:
     # LOG_ALL_TO_FILE
     out["LOG_ALL_TO_FILE"] = bool(data.get("LOG_ALL_TO_FILE", LOG_ALL_TO_FILE))
 
+    # Response cache
+    out["CACHE_ENABLED"] = bool(data.get("CACHE_ENABLED", CACHE_ENABLED))
+    try:
+        out["CACHE_TTL_SEC"] = max(0, int(data.get("CACHE_TTL_SEC", CACHE_TTL_SEC)))
+    except Exception:
+        out["CACHE_TTL_SEC"] = CACHE_TTL_SEC
+
     # N_WORKERS (1..8)
     try:
         n = int(data.get("N_WORKERS", N_WORKERS))
@@ -78,6 +162,16 @@ def _validate_settings(data: dict) -> dict:
     except Exception:
         out["N_WORKERS"] = N_WORKERS
 
+    # WORKER_DIVERSITY
+    out["WORKER_DIVERSITY"] = bool(data.get("WORKER_DIVERSITY", WORKER_DIVERSITY))
+
+    # SYNTH_QUORUM (0 = all workers, else 1..8)
+    try:
+        q = int(data.get("SYNTH_QUORUM", SYNTH_QUORUM))
+        out["SYNTH_QUORUM"] = max(0, min(8, q))
+    except Exception:
+        out["SYNTH_QUORUM"] = SYNTH_QUORUM
+
     # Retry policy (bounds)
     try:
         rmax = int(data.get("RETRY_MAX", RETRY_MAX))
@@ -91,21 +185,75 @@ def _validate_settings(data: dict) -> dict:
     except Exception:
         out["RETRY_DELAY_SEC"] = RETRY_DELAY_SEC
 
+    try:
+        rcap = float(data.get("RETRY_DELAY_CAP_SEC", RETRY_DELAY_CAP_SEC))
+        out["RETRY_DELAY_CAP_SEC"] = max(1.0, min(300.0, rcap))
+    except Exception:
+        out["RETRY_DELAY_CAP_SEC"] = RETRY_DELAY_CAP_SEC
+
+    try:
+        out["ATTEMPT_TIMEOUT_SEC"] = max(0.0, float(data.get("ATTEMPT_TIMEOUT_SEC", ATTEMPT_TIMEOUT_SEC)))
+    except Exception:
+        out["ATTEMPT_TIMEOUT_SEC"] = ATTEMPT_TIMEOUT_SEC
+
+    out["SYNTH_CANCEL_STRAGGLERS"] = bool(data.get("SYNTH_CANCEL_STRAGGLERS", SYNTH_CANCEL_STRAGGLERS))
+    out["SPECULATIVE_SYNTH"] = bool(data.get("SPECULATIVE_SYNTH", SPECULATIVE_SYNTH))
+
+    # History compaction
+    try:
+        out["HISTORY_MAX_TURNS"] = max(0, int(data.get("HISTORY_MAX_TURNS", HISTORY_MAX_TURNS)))
+    except Exception:
+        out["HISTORY_MAX_TURNS"] = HISTORY_MAX_TURNS
+    sm = data.get("SUMMARY_MODEL", SUMMARY_MODEL)
+    out["SUMMARY_MODEL"] = sm if isinstance(sm, str) and sm else SUMMARY_MODEL
+
+    # Rate limiting (bounds)
+    try:
+        out["MAX_CONCURRENCY"] = max(1, min(16, int(data.get("MAX_CONCURRENCY", MAX_CONCURRENCY))))
+    except Exception:
+        out["MAX_CONCURRENCY"] = MAX_CONCURRENCY
+
+    try:
+        out["RATE_LIMIT_RPM"] = max(0, int(data.get("RATE_LIMIT_RPM", RATE_LIMIT_RPM)))
+    except Exception:
+        out["RATE_LIMIT_RPM"] = RATE_LIMIT_RPM
+
+    try:
+        out["RATE_LIMIT_TPM"] = max(0, int(data.get("RATE_LIMIT_TPM", RATE_LIMIT_TPM)))
+    except Exception:
+        out["RATE_LIMIT_TPM"] = RATE_LIMIT_TPM
+
     return out
 
 def _apply_settings(valid: dict) -> None:
     """Write validated settings into module globals and recompute derived values."""
     global CURRENT_MODEL, REASONING_LEVEL, TEXT_VERBOSITY, LOG_ALL_TO_FILE
-    global N_WORKERS, WORKER_NAMES, RETRY_MAX, RETRY_DELAY_SEC
+    global N_WORKERS, WORKER_NAMES, WORKER_DIVERSITY, SYNTH_QUORUM, RETRY_MAX, RETRY_DELAY_SEC
+    global RETRY_DELAY_CAP_SEC, ATTEMPT_TIMEOUT_SEC, SPECULATIVE_SYNTH, SYNTH_CANCEL_STRAGGLERS, HISTORY_MAX_TURNS, SUMMARY_MODEL
+    global MAX_CONCURRENCY, RATE_LIMIT_RPM, RATE_LIMIT_TPM, CACHE_ENABLED, CACHE_TTL_SEC
 
     CURRENT_MODEL   = valid["CURRENT_MODEL"]
     REASONING_LEVEL = valid["REASONING_LEVEL"]
     TEXT_VERBOSITY  = valid["TEXT_VERBOSITY"]
     LOG_ALL_TO_FILE = valid["LOG_ALL_TO_FILE"]
     N_WORKERS       = valid["N_WORKERS"]
+    WORKER_DIVERSITY = valid["WORKER_DIVERSITY"]
+    SYNTH_QUORUM    = valid["SYNTH_QUORUM"]
+    SPECULATIVE_SYNTH = valid["SPECULATIVE_SYNTH"]
+    SYNTH_CANCEL_STRAGGLERS = valid["SYNTH_CANCEL_STRAGGLERS"]
+    HISTORY_MAX_TURNS = valid["HISTORY_MAX_TURNS"]
+    SUMMARY_MODEL   = valid["SUMMARY_MODEL"]
     RETRY_MAX       = int(valid["RETRY_MAX"])
     RETRY_DELAY_SEC = float(valid["RETRY_DELAY_SEC"])
+    RETRY_DELAY_CAP_SEC = valid["RETRY_DELAY_CAP_SEC"]
+    ATTEMPT_TIMEOUT_SEC = valid["ATTEMPT_TIMEOUT_SEC"]
+    MAX_CONCURRENCY = valid["MAX_CONCURRENCY"]
+    RATE_LIMIT_RPM  = valid["RATE_LIMIT_RPM"]
+    RATE_LIMIT_TPM  = valid["RATE_LIMIT_TPM"]
+    CACHE_ENABLED   = valid["CACHE_ENABLED"]
+    CACHE_TTL_SEC   = valid["CACHE_TTL_SEC"]
     WORKER_NAMES[:] = [f"Worker-{i+1}" for i in range(N_WORKERS)]
+    refresh_request_params()
 
 def to_dict() -> dict:
     """Export current settings to a JSON-serializable dict (not session tokens)."""
@@ -116,8 +264,21 @@ def to_dict() -> dict:
         "TEXT_VERBOSITY": TEXT_VERBOSITY,
         "LOG_ALL_TO_FILE": LOG_ALL_TO_FILE,
         "N_WORKERS": N_WORKERS,
+        "WORKER_DIVERSITY": WORKER_DIVERSITY,
+        "SYNTH_QUORUM": SYNTH_QUORUM,
+        "SYNTH_CANCEL_STRAGGLERS": SYNTH_CANCEL_STRAGGLERS,
+        "SPECULATIVE_SYNTH": SPECULATIVE_SYNTH,
+        "HISTORY_MAX_TURNS": HISTORY_MAX_TURNS,
+        "SUMMARY_MODEL": SUMMARY_MODEL,
         "RETRY_MAX": RETRY_MAX,
         "RETRY_DELAY_SEC": RETRY_DELAY_SEC,
+        "RETRY_DELAY_CAP_SEC": RETRY_DELAY_CAP_SEC,
+        "ATTEMPT_TIMEOUT_SEC": ATTEMPT_TIMEOUT_SEC,
+        "MAX_CONCURRENCY": MAX_CONCURRENCY,
+        "RATE_LIMIT_RPM": RATE_LIMIT_RPM,
+        "RATE_LIMIT_TPM": RATE_LIMIT_TPM,
+        "CACHE_ENABLED": CACHE_ENABLED,
+        "CACHE_TTL_SEC": CACHE_TTL_SEC,
     }
 
 def load_settings() -> None:
@@ -125,7 +286,8 @@ def load_settings() -> None:
     if not SETTINGS_PATH.exists():
         return
     try:
-        data = json.loads(SETTINGS_PATH.read_text(encoding="utf-8"))
+        raw = SETTINGS_PATH.read_bytes()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw.decode("utf-8"))
         valid = _validate_settings(data or {})
         _apply_settings(valid)
     except Exception:
@@ -136,7 +298,10 @@ def save_settings() -> None:
     data = to_dict()
     try:
         tmp = SETTINGS_PATH.with_suffix(".tmp")
-        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        if orjson is not None:
+            tmp.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+        else:
+            tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
         tmp.replace(SETTINGS_PATH)
     except Exception:
         pass
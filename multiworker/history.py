@@ -0,0 +1,84 @@
+# File: multiworker/history.py
+import asyncio
+import hashlib
+import json
+from typing import Dict, List
+
+from . import config
+from .openai_calls import call_summarize
+
+# Summaries by hash of the turns they replace (bounded; cleared when full)
+_SUMMARIES: Dict[str, str] = {}
+_SUMMARIES_MAX = 32
+# Summaries being written; referenced here so the tasks aren't garbage-collected
+_PENDING: Dict[str, asyncio.Task] = {}
+
+
+def _turn_starts(history: List[Dict[str, str]]) -> List[int]:
+    """Index of each user message, i.e. where each turn begins."""
+    return [i for i, m in enumerate(history) if m["role"] == "user"]
+
+
+def get_last_user_content(history: List[Dict[str, str]]) -> str:
+    """Content of the most recent user message, or "" if there is none."""
+    # Index walk from the end: during a turn the user message is the last entry
+    for i in range(len(history) - 1, -1, -1):
+        if history[i]["role"] == "user":
+            return history[i]["content"]
+    return ""
+
+
+def _summary_key(messages: List[Dict[str, str]]) -> str:
+    blob = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+async def _summarize(client, key: str, messages: List[Dict[str, str]], session: str) -> None:
+    transcript = "\n\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    text, usage = await call_summarize(client, transcript)
+    if config.SESSION_ID != session:
+        # /clear or /load happened meanwhile: the summary and its tokens belong to
+        # a conversation that is gone, so keep them out of the new session
+        return
+    if text:
+        if len(_SUMMARIES) >= _SUMMARIES_MAX:
+            _SUMMARIES.clear()
+        _SUMMARIES[key] = text
+    config.add_tokens(config.RUNNING_TOKENS, usage)
+
+
+def _on_done(key: str, task: asyncio.Task) -> None:
+    _PENDING.pop(key, None)
+    if not task.cancelled():
+        task.exception()  # best-effort: the full history is used until a summary exists
+
+
+def compact(client, history: List[Dict[str, str]], max_turns: int) -> List[Dict[str, str]]:
+    """
+    Keep recent turns verbatim and replace older ones with a single summary message.
+    The cut point advances in steps of `max_turns` turns, so the summary (and the
+    prompt prefix it starts) stays byte-identical for several turns and keeps hitting
+    the prompt cache. Summaries are written in the background by the small
+    SUMMARY_MODEL; until one is ready the previous summary (or the full history)
+    is used.
+    """
+    if max_turns <= 0:
+        return history
+    starts = _turn_starts(history)
+    excess = len(starts) - max_turns
+    if excess < max_turns:
+        return history
+    # Candidate cut points, newest first; use the newest one whose summary is ready
+    cuts = [starts[n] for n in range((excess // max_turns) * max_turns, 0, -max_turns)]
+    for i, cut in enumerate(cuts):
+        key = _summary_key(history[:cut])
+        summary = _SUMMARIES.get(key)
+        if summary is not None:
+            note = {"role": "assistant", "content": "Summary of the earlier conversation:\n" + summary}
+            return [note, *history[cut:]]
+        if i == 0 and key not in _PENDING:
+            # Tagged with the session at start (the task body only runs later)
+            task = asyncio.create_task(_summarize(client, key, history[:cut], config.SESSION_ID))
+            _PENDING[key] = task
+            task.add_done_callback(lambda t, key=key: _on_done(key, t))
+    return history
@@ -0,0 +1,97 @@
+# File: multiworker/llm_cache.py
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+class LLMCache:
+    """
+    Exact-match response cache persisted in SQLite, fronted by an in-process LRU.
+    Keys are request hashes (see openai_calls._request_key); values are (text, usage).
+    Entries older than `ttl_sec` are ignored and overwritten. The async methods
+    answer from memory when they can and otherwise run the blocking sqlite calls
+    on a worker thread.
+    """
+
+    def __init__(self, path: Path, ttl_sec: float = 7 * 24 * 3600, mem_size: int = 512):
+        self.path = Path(path)
+        self.ttl_sec = float(ttl_sec)
+        self.mem_size = mem_size
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()   # one connection shared by executor threads
+        # key -> (monotonic expiry, text, usage); most recently used last
+        self._mem: "OrderedDict[str, Tuple[float, str, Dict[str, int]]]" = OrderedDict()
+
+    def _mem_get(self, key: str) -> Optional[Tuple[str, Dict[str, int]]]:
+        entry = self._mem.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._mem[key]
+            return None
+        self._mem.move_to_end(key)
+        return entry[1], entry[2]
+
+    def _mem_put(self, key: str, text: str, usage: Dict[str, int]) -> None:
+        self._mem[key] = (time.monotonic() + self.ttl_sec, text, usage)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.mem_size:
+            self._mem.popitem(last=False)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL, usage TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get_sync(self, key: str) -> Optional[Tuple[str, Dict[str, int]]]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT text, usage, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[2] > self.ttl_sec:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put_sync(self, key: str, text: str, usage: Dict[str, int]) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, text, usage, created) VALUES (?, ?, ?, ?)",
+                (key, text, json.dumps(usage), time.time()),
+            )
+            db.commit()
+
+    async def get(self, key: str) -> Optional[Tuple[str, Dict[str, int]]]:
+        hit = self._mem_get(key)
+        if hit is None:
+            hit = await asyncio.to_thread(self.get_sync, key)
+            if hit is not None:
+                self._mem_put(key, *hit)
+        if hit is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return hit
+
+    async def put(self, key: str, text: str, usage: Dict[str, int]) -> None:
+        self._mem_put(key, text, usage)
+        await asyncio.to_thread(self.put_sync, key, text, usage)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
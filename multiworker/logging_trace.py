@@ -1,41 +1,70 @@
 # File: multiworker/logging_trace.py
+import asyncio
+import io
 import os
 import time
 from .ui import fmt_elapsed
 from .types import AgentState
 
 def build_full_trace(user_msg: str, states: list[AgentState], synth: AgentState, history: list[dict]) -> str:
-    lines = []
-    ts = time.strftime("%Y-%m-%d %H:%M:%S")
-    lines.append(f"[Run @ {ts}]")
-    lines.append("")
-    lines.append("=== CHAT HISTORY BEFORE THIS TURN ===")
+    # Stream straight into one buffer instead of a list of small strings + join
+    buf = io.StringIO()
+    w = buf.write
+    w(f"[Run @ {time.strftime('%Y-%m-%d %H:%M:%S')}]\n\n")
+    w("=== CHAT HISTORY BEFORE THIS TURN ===\n")
     for m in history[:-1]:
-        lines.append(f"{m['role']}: {m['content']}")
-    lines.append("")
-    lines.append("=== LATEST USER MESSAGE ===")
-    lines.append(user_msg.strip())
-    lines.append("")
-    lines.append("=== WORKER DRAFTS ===")
+        w(f"{m['role']}: {m['content']}\n")
+    w("\n=== LATEST USER MESSAGE ===\n")
+    w(user_msg.strip())
+    w("\n\n=== WORKER DRAFTS ===\n")
     for st in states:
-        lines.append(f"\n--- {st.name} ({st.model}) | elapsed {fmt_elapsed(st.elapsed)} | "
-                     f"status: {'ok' if st.ok else 'error' if st.ok is False else 'running'} ---")
+        w(f"\n--- {st.name} ({st.model}) | elapsed {fmt_elapsed(st.elapsed)} | "
+          f"status: {'ok' if st.ok else 'error' if st.ok is False else 'running'} ---\n")
         if st.ok and st.output_text:
-            lines.append(st.output_text)
+            w(st.output_text)
         elif st.error:
-            lines.append(f"[ERROR] {st.error}")
+            w(f"[ERROR] {st.error}")
         else:
-            lines.append("[no output]")
-    lines.append("")
-    lines.append("=== FINAL ANSWER ===")
-    lines.append(synth.output_text or "")
-    lines.append("")
-    return "\n".join(lines)
+            w("[no output]")
+        w("\n")
+    w("\n=== FINAL ANSWER ===\n")
+    w(synth.output_text or "")
+    w("\n")
+    return buf.getvalue()
 
 def write_trace_to_file(content: str) -> str:
     ts = time.strftime("%Y%m%d-%H%M%S")
     fname = f"gpt5_trace_{ts}.txt"
     path = os.path.join(os.getcwd(), fname)
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(content)
+    # Encode up front and issue one unbuffered write to a sibling temp file, then
+    # swap it in, so a trace on disk is never half-written
+    tmp = path + ".tmp"
+    with open(tmp, "wb", buffering=0) as f:
+        f.write(content.encode("utf-8"))
+    os.replace(tmp, path)
     return path
+
+# Trace writes still in flight; referenced here so the tasks aren't garbage-collected
+_PENDING_WRITES: set[asyncio.Task] = set()
+
+def _on_write_done(task: asyncio.Task) -> None:
+    _PENDING_WRITES.discard(task)
+    if not task.cancelled():
+        task.exception()  # trace logging is best-effort; mark any error as retrieved
+
+def _build_and_write(user_msg: str, states: list[AgentState], synth: AgentState, history: list[dict]) -> str:
+    return write_trace_to_file(build_full_trace(user_msg, states, synth, history))
+
+def write_trace_in_background(user_msg: str, states: list[AgentState], synth: AgentState, history: list[dict]) -> None:
+    """
+    Build and write the trace on a worker thread without delaying the answer or the
+    next prompt. Pass data the caller won't mutate afterwards (e.g. a copy of history).
+    """
+    task = asyncio.create_task(asyncio.to_thread(_build_and_write, user_msg, states, synth, history))
+    _PENDING_WRITES.add(task)
+    task.add_done_callback(_on_write_done)
+
+async def flush_pending_traces() -> None:
+    """Wait for background trace writes to finish (call before exiting)."""
+    if _PENDING_WRITES:
+        await asyncio.gather(*_PENDING_WRITES, return_exceptions=True)
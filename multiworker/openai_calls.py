@@ -1,48 +1,204 @@
 # File: multiworker/openai_calls.py
+from __future__ import annotations
+
 import asyncio
+import hashlib
+import json
+import logging
+import random
 import re
-import math
-from typing import Dict, List, Tuple
-from openai import AsyncOpenAI
+from collections import deque
+from itertools import chain
+from typing import TYPE_CHECKING, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
 
 from . import config
+from .llm_cache import LLMCache
+from .ratelimit import AsyncRateLimiter
+from .types import PreparedRequest
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+_log = logging.getLogger(__name__)
 
 # ---------- Retry telemetry (for Stats footer) ----------
-_RETRY_COUNT = 0                 # total number of retry attempts (sleeps)
-_RETRY_EVENTS = 0                # number of requests that required at least one retry
-_RETRY_DELAYS: list[float] = []  # seconds slept per retry
+# Mutated in place, so no `global` rebinding is needed:
+#   count  - total number of retry attempts (sleeps)
+#   events - number of requests that required at least one retry
+#   delays - seconds slept per retry (most recent 256)
+_STATE: dict = {"count": 0, "events": 0, "delays": deque(maxlen=256)}
+
+# "... Please try again in 29.786s." in rate-limit error messages
+_RETRY_AFTER_RE = re.compile(r"try again in\s+([0-9]+(?:\.[0-9]+)?)s", re.IGNORECASE)
 
 
 def get_retry_stats(reset: bool = False) -> dict:
-    """Return aggregate retry telemetry. Optionally reset after reading."""
-    global _RETRY_COUNT, _RETRY_EVENTS, _RETRY_DELAYS
+    """Return aggregate retry (and response cache) telemetry. Optionally reset after reading."""
     stats = {
-        "retries_total": _RETRY_COUNT,
-        "retry_events": _RETRY_EVENTS,
-        "delays": list(_RETRY_DELAYS),
+        "retries_total": _STATE["count"],
+        "retry_events": _STATE["events"],
+        "delays": list(_STATE["delays"]),
+        "cache_hits": _CACHE.hits if _CACHE is not None else 0,
+        "cache_misses": _CACHE.misses if _CACHE is not None else 0,
     }
     if reset:
-        _RETRY_COUNT = 0
-        _RETRY_EVENTS = 0
-        _RETRY_DELAYS.clear()
+        _STATE["count"] = 0
+        _STATE["events"] = 0
+        _STATE["delays"].clear()
+        if _CACHE is not None:
+            _CACHE.hits = _CACHE.misses = 0
     return stats
 
 
+def get_retry_counters() -> Tuple[int, int]:
+    """(retries_total, retry_events) without copying the delay history; cheap enough per frame."""
+    return _STATE["count"], _STATE["events"]
+
+
+def get_cache_counters() -> Tuple[int, int]:
+    """(hits, misses) of the response cache since the last reset."""
+    return (_CACHE.hits, _CACHE.misses) if _CACHE is not None else (0, 0)
+
+
+# ---------- Client-side rate limiting ----------
+_LIMITER: Optional[AsyncRateLimiter] = None
+_LIMITER_CFG: tuple = ()
+
+
+def _limiter() -> AsyncRateLimiter:
+    """Shared limiter; rebuilt when the rate-limit settings change."""
+    global _LIMITER, _LIMITER_CFG
+    cfg = (config.RATE_LIMIT_RPM, config.RATE_LIMIT_TPM, config.MAX_CONCURRENCY)
+    if _LIMITER is None or cfg != _LIMITER_CFG:
+        _LIMITER = AsyncRateLimiter(*cfg)
+        _LIMITER_CFG = cfg
+    return _LIMITER
+
+
+def _estimate_tokens(params: dict) -> int:
+    """Rough prompt size (~4 chars per token) used to reserve TPM budget."""
+    chars = len(json.dumps(params.get("input", ""), ensure_ascii=False)) + len(params.get("instructions") or "")
+    return chars // 4
+
+
+async def _limited(coro_factory, est_tokens: int):
+    """Run one API attempt inside a limiter slot, then settle its actual token usage."""
+    limiter = _limiter()
+    async with limiter.slot(est_tokens):
+        resp = await coro_factory()
+    limiter.record(est_tokens, _extract_usage(resp)["total"])
+    return resp
+
+
+# ---------- Single-flight (coalesce identical in-flight requests) ----------
+_INFLIGHT: Dict[str, asyncio.Task] = {}
+# Number of callers awaiting each in-flight task
+_WAITERS: Dict[asyncio.Task, int] = {}
+
+
+def _forget(key: str, task: asyncio.Task) -> None:
+    if _INFLIGHT.get(key) is task:
+        del _INFLIGHT[key]
+
+
+def _json_default(obj):
+    # Read-only params (config.REASONING_PARAMS etc.) hash like the dicts they wrap
+    return dict(obj) if isinstance(obj, Mapping) else str(obj)
+
+
+# Routing hints that don't change what the model is asked; left out of request keys
+# so the same request hashes the same in every conversation
+_ROUTING_FIELDS = ("prompt_cache_key",)
+
+
+def _request_key(payload: dict) -> str:
+    """Stable hash of a request payload (model, instructions, input, ...)."""
+    payload = {k: v for k, v in payload.items() if k not in _ROUTING_FIELDS}
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+async def _single_flight(key: str, coro_factory) -> Tuple[object, bool]:
+    """
+    Run coro_factory() once per key; concurrent callers with the same key await
+    the same task. Returns (result, shared) where shared is True for followers.
+    The task is shielded so cancelling one waiter doesn't cancel the others, and
+    cancelled once every waiter is gone, so an abandoned call (e.g. a straggler
+    dropped at quorum) doesn't keep streaming, holding a limiter slot and billing.
+    """
+    task = _INFLIGHT.get(key)
+    shared = task is not None
+    if task is None:
+        task = asyncio.ensure_future(coro_factory())
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda t: _forget(key, t))
+    _WAITERS[task] = _WAITERS.get(task, 0) + 1
+    try:
+        return await asyncio.shield(task), shared
+    finally:
+        _WAITERS[task] -= 1
+        if not _WAITERS[task]:
+            del _WAITERS[task]
+            if not task.done():
+                # Last waiter cancelled: stop the call, and let the next caller start afresh
+                task.cancel()
+                _forget(key, task)
+
+
+# ---------- Response cache (opt-in via config.CACHE_ENABLED) ----------
+_CACHE: Optional[LLMCache] = None
+
+
+def _cache() -> Optional[LLMCache]:
+    """Shared on-disk cache, or None when caching is off."""
+    global _CACHE
+    if not config.CACHE_ENABLED:
+        return None
+    if _CACHE is None:
+        _CACHE = LLMCache(config.CACHE_DIR / "responses.sqlite3")
+    _CACHE.ttl_sec = config.CACHE_TTL_SEC
+    return _CACHE
+
+
+def close_cache() -> None:
+    """Close the response cache's database connection if it was ever opened."""
+    global _CACHE
+    if _CACHE is not None:
+        _CACHE.close()
+        _CACHE = None
+
+
+_EMPTY = ()
+
+
+def _scan_slow(resp) -> str:
+    """Join the output_text blocks of resp.output (when output_text isn't populated)."""
+    blocks = chain.from_iterable(getattr(item, "content", None) or _EMPTY for item in getattr(resp, "output", None) or _EMPTY)
+    return "".join(getattr(b, "text", "") for b in blocks if getattr(b, "type", None) == "output_text").strip()
+
+
 def _extract_output_text(resp) -> str:
     txt = getattr(resp, "output_text", None)
-    if isinstance(txt, str) and txt.strip():
+    # isspace() tests for blank text without allocating a stripped copy
+    if isinstance(txt, str) and txt and not txt.isspace():
         return txt.strip()
     try:
-        chunks = []
-        for item in getattr(resp, "output", []):
-            for block in getattr(item, "content", []):
-                if getattr(block, "type", None) == "output_text":
-                    chunks.append(getattr(block, "text", ""))
-        if chunks:
-            return "".join(chunks).strip()
+        text = _scan_slow(resp)
     except Exception:
-        pass
-    return str(resp)
+        text = ""
+    if not text:
+        # Repr of the whole response only when debug logging is on
+        _log.debug("response without output text: %r", resp)
+    return text
+
+
+def _usage_field(usage, name: str) -> int:
+    # Some SDKs use attributes (the common case, no exception raised), others dict-like
+    try:
+        val = getattr(usage, name)
+    except AttributeError:
+        val = usage.get(name) if isinstance(usage, dict) else None
+    return int(val or 0)
 
 
 def _extract_usage(resp) -> Dict[str, int]:
@@ -50,44 +206,57 @@ def _extract_usage(resp) -> Dict[str, int]:
     Try to pull token usage from response.
     Returns dict with keys: input, output, total. Falls back to zeros.
     """
-    input_t = output_t = total_t = 0
     try:
         usage = getattr(resp, "usage", None) or {}
-        # Some SDKs use attributes, others dict-like
-        input_t = getattr(usage, "input_tokens", None) or usage.get("input_tokens", 0)
-        output_t = getattr(usage, "output_tokens", None) or usage.get("output_tokens", 0)
-        total_t = getattr(usage, "total_tokens", None) or usage.get("total_tokens", 0)
+        input_t = _usage_field(usage, "input_tokens")
+        output_t = _usage_field(usage, "output_tokens")
         # Fallback compute total if missing
-        if not total_t:
-            total_t = int(input_t) + int(output_t)
-        return {"input": int(input_t or 0), "output": int(output_t or 0), "total": int(total_t or 0)}
+        total_t = _usage_field(usage, "total_tokens") or input_t + output_t
+        return {"input": input_t, "output": output_t, "total": total_t}
     except Exception:
         return {"input": 0, "output": 0, "total": 0}
 
 
+def _is_retryable(err: Exception) -> bool:
+    """Client errors (4xx) won't succeed on retry, except timeout, conflict and rate limit."""
+    code = getattr(err, "status_code", None)
+    return not (isinstance(code, int) and 400 <= code < 500 and code not in (408, 409, 429))
+
+
 async def _request_with_retries(coro_factory):
     """
     Retry wrapper:
-      - Up to config.RETRY_MAX times
-      - Waits at least config.RETRY_DELAY_SEC between tries
+      - Up to config.RETRY_MAX times; non-retryable 4xx errors are raised at once
+      - Each attempt is bounded by config.ATTEMPT_TIMEOUT_SEC (0 = no limit)
+      - Backoff is exponential with decorrelated jitter, starting at config.RETRY_DELAY_SEC
+        and capped at config.RETRY_DELAY_CAP_SEC, so concurrent workers don't retry in lockstep
       - If a 429/rate-limit suggests a wait (Retry-After header or 'try again in Xs'),
-        sleep for max(RETRY_DELAY_SEC, suggested).
+        sleep at least that long (plus up to 20% jitter).
       - Records telemetry for Stats footer.
     """
-    global _RETRY_COUNT, _RETRY_EVENTS, _RETRY_DELAYS
-
     last_err = None
     any_retry_this_call = False
+    base = float(config.RETRY_DELAY_SEC)
+    cap = max(base, float(config.RETRY_DELAY_CAP_SEC))
+    prev_delay = base
 
     for attempt in range(1, config.RETRY_MAX + 1):
         try:
+            if config.ATTEMPT_TIMEOUT_SEC:
+                return await asyncio.wait_for(coro_factory(), timeout=config.ATTEMPT_TIMEOUT_SEC)
             return await coro_factory()
         except Exception as e:
             last_err = e
+            if not _is_retryable(e):
+                raise
 
-            # Base delay from config
-            delay = float(config.RETRY_DELAY_SEC)
+            # Decorrelated jitter: the range grows ~3x per retry, never below base or above
+            # cap. Drawing inside [base, cap] (rather than clamping the draw to cap) keeps
+            # concurrent retries spread out once the cap is reached
+            delay = random.uniform(base, min(cap, prev_delay * 3))
+            prev_delay = delay
 
+            suggested = 0.0
             # Respect Retry-After header if available
             try:
                 resp = getattr(e, "response", None)
@@ -95,7 +264,7 @@ async def _request_with_retries(coro_factory):
                     ra = resp.headers.get("retry-after") or resp.headers.get("Retry-After")
                     if ra:
                         try:
-                            delay = max(delay, float(ra))
+                            suggested = float(ra)
                         except Exception:
                             pass
             except Exception:
@@ -104,49 +273,183 @@ async def _request_with_retries(coro_factory):
             # Parse "... Please try again in 29.786s."
             try:
                 msg = str(e)
-                m = re.search(r"try again in\s+([0-9]+(?:\.[0-9]+)?)s", msg, re.IGNORECASE)
+                m = _RETRY_AFTER_RE.search(msg)
                 if m:
-                    suggested = float(m.group(1))
-                    delay = max(delay, math.ceil(suggested))
+                    suggested = max(suggested, float(m.group(1)))
             except Exception:
                 pass
 
+            if suggested:
+                delay = max(delay, suggested * random.uniform(1.0, 1.2))
+
             if attempt < config.RETRY_MAX:
                 # Telemetry
                 if not any_retry_this_call:
-                    _RETRY_EVENTS += 1
+                    _STATE["events"] += 1
                     any_retry_this_call = True
-                _RETRY_COUNT += 1
-                _RETRY_DELAYS.append(delay)
+                _STATE["count"] += 1
+                _STATE["delays"].append(delay)
 
                 await asyncio.sleep(delay)
             else:
                 raise last_err
 
 
-async def call_worker(client: AsyncOpenAI, history: List[Dict[str, str]]) -> Tuple[str, Dict[str, int]]:
+def prepare_worker_request(history: List[Dict[str, str]]) -> PreparedRequest:
+    """
+    Build the worker request once per turn. Every worker sends the same params
+    (the Responses API has no n= sampling), so the payload and its single-flight
+    key are computed once and shared by all N calls. The shared prompt_cache_key
+    routes the N concurrent calls to the same prompt cache, so after the first
+    prefill the others can reuse the cached history prefix. Never add per-worker
+    content to the prompt: workers differ only by sampling (the `slot` passed to
+    call_worker affects the local coalescing key, not the request).
+    """
+    params = dict(
+        model=config.CURRENT_MODEL,
+        instructions=config.WORKER_INSTRUCTION,
+        input=history,
+        reasoning=config.REASONING_PARAMS,
+        text=config.TEXT_PARAMS,
+        prompt_cache_key=config.SESSION_ID,
+    )
+    return PreparedRequest(params, _request_key(params), _estimate_tokens(params))
+
+
+async def call_worker(
+    client: AsyncOpenAI,
+    request: PreparedRequest,
+    slot: Optional[str] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
+    on_restart: Optional[Callable[[], None]] = None,
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Request one worker draft from a prepared request (see prepare_worker_request).
+    Identical concurrent requests share a single API call; pass a distinct `slot`
+    (e.g. the worker name) to force an independent sample. Followers of a shared
+    call report zero usage so tokens are only counted once.
+    With on_delta, the draft is streamed and each text delta is passed to it (the
+    caller that issues the shared call gets the deltas; followers get the result only).
+    on_restart is called when a retry starts over after deltas were already passed,
+    so the caller can drop the failed attempt's partial text.
+    """
+    params, key = request.params, request.key
+    emitted = False
+
+    def _emit(delta: str) -> None:
+        nonlocal emitted
+        emitted = True
+        on_delta(delta)
+
     async def _do():
-        return await client.responses.create(
-            model=config.CURRENT_MODEL,
-            instructions=config.WORKER_INSTRUCTION,
-            input=history,
-            reasoning=config.reasoning_dict(),
-            text=config.text_dict(),
-        )
-    resp = await _request_with_retries(_do)
+        nonlocal emitted
+        if on_delta is None:
+            return await _limited(lambda: client.responses.create(**params), request.est_tokens)
+        if emitted:
+            emitted = False
+            if on_restart is not None:
+                on_restart()
+        return await _limited(lambda: _stream_response(client, params, _emit), request.est_tokens)
+    if slot is not None:
+        key = f"{key}:{slot}"
+    cache = _cache()
+    if cache is not None:
+        hit = await cache.get(key)
+        if hit is not None:
+            return hit[0], {"input": 0, "output": 0, "total": 0}
+    resp, shared = await _single_flight(key, lambda: _request_with_retries(_do))
+    text = _extract_output_text(resp)
+    if shared:
+        return text, {"input": 0, "output": 0, "total": 0}
+    usage = _extract_usage(resp)
+    if cache is not None:
+        await cache.put(key, text, usage)
+    return text, usage
+
+
+async def call_summarize(client: AsyncOpenAI, transcript: str) -> Tuple[str, Dict[str, int]]:
+    """Summarize a conversation transcript with the small SUMMARY_MODEL (see history.compact)."""
+    params = dict(
+        model=config.SUMMARY_MODEL,
+        instructions=config.SUMMARY_INSTRUCTION,
+        input=[{"role": "user", "content": transcript}],
+        reasoning={"effort": "minimal"},
+    )
+    est_tokens = _estimate_tokens(params)
+    resp = await _request_with_retries(
+        lambda: _limited(lambda: client.responses.create(**params), est_tokens)
+    )
     return _extract_output_text(resp), _extract_usage(resp)
 
 
-async def call_synth(client: AsyncOpenAI, history: List[Dict[str, str]], drafts: Dict[str, str]) -> Tuple[str, Dict[str, int]]:
-    stitched = "\n\n".join(f"### {name}\n{text.strip()}" for name, text in drafts.items())
-    synth_input = history + [{"role": "assistant", "content": "WORKER DRAFTS:\n" + stitched}]
+async def _stream_response(client: AsyncOpenAI, params: dict, on_delta: Callable[[str], None]):
+    """Stream a response, feeding output text deltas to on_delta; returns the final response."""
+    async with client.responses.stream(**params) as stream:
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                on_delta(event.delta)
+        return await stream.get_final_response()
+
+
+async def call_synth(
+    client: AsyncOpenAI,
+    history: Sequence[Dict[str, str]],
+    drafts: Dict[str, str],
+    on_delta: Optional[Callable[[str], None]] = None,
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Merge worker drafts into the final answer. With on_delta, the answer is streamed
+    and each text delta is passed to it as it arrives; the full text is still returned.
+    A cached answer is returned whole without calling on_delta.
+    """
+    # Cache-friendly layout: static instructions, then the history prefix unchanged,
+    # then all volatile content in one final message. Drafts are ordered by worker
+    # name (not completion order) so reruns stitch identically. They arrive already
+    # stripped (call_worker returns normalized text), so they are joined as-is.
+    order = {name: i for i, name in enumerate(config.WORKER_NAMES)}
+    ordered = sorted(drafts.items(), key=lambda kv: (order.get(kv[0], len(order)), kv[0]))
+    # Identical drafts are sent once under all their authors' names
+    # ("### Worker-1, Worker-3"); the synthesizer pays for each distinct text only once
+    groups: Dict[str, List[str]] = {}
+    for name, text in ordered:
+        groups.setdefault(text, []).append(name)
+    if len(groups) < len(ordered):
+        _log.debug("synth: %d drafts, %d distinct", len(ordered), len(groups))
+    stitched = "\n\n".join(f"### {', '.join(names)}\n{text}" for text, names in groups.items())
+    synth_input = [*history, {"role": "user", "content": "WORKER DRAFTS:\n" + stitched}]
+    params = dict(
+        model=config.CURRENT_MODEL,
+        instructions=config.SYNTH_INSTRUCTION,
+        input=synth_input,
+        reasoning=config.REASONING_PARAMS,
+        text=config.TEXT_PARAMS,
+        prompt_cache_key=config.SESSION_ID,
+    )
+    cache_key = _request_key(params)
+    cache = _cache()
+    if cache is not None:
+        hit = await cache.get(cache_key)
+        if hit is not None:
+            return hit[0], {"input": 0, "output": 0, "total": 0}
+    est_tokens = _estimate_tokens(params)
+    emitted = False
+
+    def _emit(delta: str) -> None:
+        nonlocal emitted
+        emitted = True
+        on_delta(delta)
+
     async def _do():
-        return await client.responses.create(
-            model=config.CURRENT_MODEL,
-            instructions=config.SYNTH_INSTRUCTION,
-            input=synth_input,
-            reasoning=config.reasoning_dict(),
-            text=config.text_dict(),
-        )
+        nonlocal emitted
+        if on_delta is None:
+            return await _limited(lambda: client.responses.create(**params), est_tokens)
+        if emitted:
+            # A retry restarts the answer; keep it visually apart from the partial one
+            on_delta("\n\n")
+            emitted = False
+        return await _limited(lambda: _stream_response(client, params, _emit), est_tokens)
     resp = await _request_with_retries(_do)
-    return _extract_output_text(resp), _extract_usage(resp)
+    text, usage = _extract_output_text(resp), _extract_usage(resp)
+    if cache is not None:
+        await cache.put(cache_key, text, usage)
+    return text, usage
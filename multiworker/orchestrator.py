@@ -1,13 +1,38 @@
 # File: multiworker/orchestrator.py
 import asyncio
 import time
+from difflib import SequenceMatcher
 from typing import Dict, List
 
-from .types import AgentState
-from .ui import Live, render_dashboard, console
+from rich.markup import escape
+
+from .client import get_client
+from .history import compact, get_last_user_content
+from .types import AgentState, TurnStats
+from .ui import render_dashboard, console
 from . import config
-from .openai_calls import call_worker, call_synth, get_retry_stats
-from .logging_trace import build_full_trace, write_trace_to_file
+from .openai_calls import (
+    prepare_worker_request, call_worker, call_synth,
+    get_retry_stats, get_retry_counters, get_cache_counters,
+)
+from .logging_trace import write_trace_in_background
+
+# Idle repaint rate: Live's own refresh thread animates spinners and elapsed counters;
+# state changes trigger an explicit refresh on top of that
+UI_REFRESH_PER_SEC = 4
+
+# A late draft at least this similar (difflib ratio) to one the speculative synthesis
+# already has is treated as redundant, and the speculative run is kept
+SPECULATION_MIN_SIMILARITY = 0.6
+
+def _is_novel(draft: str, seen) -> bool:
+    """True if `draft` is not close to any of the `seen` drafts."""
+    for other in seen:
+        sm = SequenceMatcher(None, other, draft)
+        # quick_ratio() is a cheap upper bound on ratio()
+        if sm.quick_ratio() >= SPECULATION_MIN_SIMILARITY and sm.ratio() >= SPECULATION_MIN_SIMILARITY:
+            return False
+    return True
 
 def _compute_stats(
     states: List[AgentState],
@@ -15,13 +40,15 @@ def _compute_stats(
     turn_start: float,
     tokens_turn: Dict[str, int],
     tokens_base: Dict[str, int],
-) -> dict:
+    now: float | None = None,
+) -> TurnStats:
     """
     Compute live stats for footer.
     - tokens_turn: per-turn usage so far
     - tokens_base: running totals at turn start (persisted across turns)
     """
-    now = time.time()
+    if now is None:
+        now = time.monotonic()
     elapsed = (synth.ended_at if synth and synth.ended_at else now) - turn_start
 
     total = len(states)
@@ -33,125 +60,253 @@ def _compute_stats(
     avg = (sum(worker_times) / len(worker_times)) if worker_times else 0.0
     mx  = max(worker_times) if worker_times else 0.0
 
-    rstats = get_retry_stats(reset=False)
+    retries_total, retry_events = get_retry_counters()
+    cache_hits, cache_misses = get_cache_counters()
 
     # Running totals = baseline at turn start + tokens accumulated this turn
     run_in  = int(tokens_base.get("input", 0))  + int(tokens_turn.get("input", 0))
     run_out = int(tokens_base.get("output", 0)) + int(tokens_turn.get("output", 0))
     run_tot = int(tokens_base.get("total", 0))  + int(tokens_turn.get("total", 0))
 
-    return {
-        "elapsed": max(0.0, elapsed),
-        "workers_total": total,
-        "workers_done": done,
-        "workers_err": err,
-        "workers_run": run,
-        "worker_avg": avg,
-        "worker_max": mx,
-        "retries_total": rstats.get("retries_total", 0),
-        "retry_events": rstats.get("retry_events", 0),
+    return TurnStats(
+        elapsed=max(0.0, elapsed),
+        workers_total=total,
+        workers_done=done,
+        workers_err=err,
+        workers_run=run,
+        worker_avg=avg,
+        worker_max=mx,
+        retries_total=retries_total,
+        retry_events=retry_events,
+        cache_hits=cache_hits,
+        cache_misses=cache_misses,
         # Per-turn tokens so far
-        "tokens_input": int(tokens_turn.get("input", 0)),
-        "tokens_output": int(tokens_turn.get("output", 0)),
-        "tokens_total": int(tokens_turn.get("total", 0)),
+        tokens_input=int(tokens_turn.get("input", 0)),
+        tokens_output=int(tokens_turn.get("output", 0)),
+        tokens_total=int(tokens_turn.get("total", 0)),
         # Running totals (baseline + this turn)
-        "tokens_run_input": run_in,
-        "tokens_run_output": run_out,
-        "tokens_run_total": run_tot,
-    }
+        tokens_run_input=run_in,
+        tokens_run_output=run_out,
+        tokens_run_total=run_tot,
+    )
 
 async def run_turn(client, history: List[Dict[str, str]]) -> str:
+    """
+    Run one orchestrated turn and return the final answer. The answer is printed
+    here: streamed below the dashboard as the synthesizer produces it, or printed
+    whole when there was nothing to stream. If synthesis fails, the error is printed
+    and the part of the answer already shown is returned ("" if none). Pass
+    client=None to use the shared session client (see client.get_client).
+    """
+    if client is None:
+        client = get_client()
     # Reset retry telemetry for this turn
     get_retry_stats(reset=True)
-    turn_start = time.time()
+    turn_start = time.monotonic()
 
     # Snapshot running totals at turn start (for stable live display)
-    tokens_base = {
-        "input":  int(config.RUNNING_TOKENS.get("input", 0)),
-        "output": int(config.RUNNING_TOKENS.get("output", 0)),
-        "total":  int(config.RUNNING_TOKENS.get("total", 0)),
-    }
+    tokens_base = dict(config.RUNNING_TOKENS)
 
-    # Per-turn token usage accumulators
+    # Per-turn token usage accumulators; updated without a lock since each update
+    # runs between awaits on the single event loop thread
     tokens_turn = {"input": 0, "output": 0, "total": 0}
-    token_lock = asyncio.Lock()
 
     states: List[AgentState] = [
         AgentState(name=config.WORKER_NAMES[i], model=config.CURRENT_MODEL)
         for i in range(config.N_WORKERS)
     ]
     synth_state = AgentState(name="Synthesizer", model=config.CURRENT_MODEL)
+    # Frozen, canonical snapshot of the conversation shared by every call this turn:
+    # workers send it as-is and the synthesizer appends its drafts after it, so the
+    # prefix stays byte-identical even if the caller's list or message dicts change
+    # mid-turn. Fixed key order and no trailing whitespace keep it identical across
+    # turns too (older turns may be collapsed into a summary, see history.compact)
+    history_prefix = tuple(
+        {"role": m["role"], "content": m["content"].rstrip()}
+        for m in compact(client, history, config.HISTORY_MAX_TURNS)
+    )
+    worker_request = prepare_worker_request(list(history_prefix))
 
     async def _run_worker(i: int):
         st = states[i]
+
+        def _on_delta(delta: str) -> None:
+            # Partial draft for the dashboard; the full text replaces it on completion
+            st.deltas.append(delta)
+
+        def _on_restart() -> None:
+            # A retry streams the draft from scratch; drop the failed attempt's text
+            # (a fresh list, so a render in progress keeps reading the old one)
+            st.deltas = []
+
         try:
-            text, usage = await call_worker(client, history)
+            slot = st.name if config.WORKER_DIVERSITY else None
+            text, usage = await call_worker(
+                client, worker_request, slot=slot, on_delta=_on_delta, on_restart=_on_restart
+            )
             st.output_text = text
+            st.deltas = []
             st.ok = True
-            st.tokens = usage  # optional attribute for debugging/logging
-            async with token_lock:
-                tokens_turn["input"]  += int(usage.get("input", 0))
-                tokens_turn["output"] += int(usage.get("output", 0))
-                tokens_turn["total"]  += int(usage.get("total", 0))
+            st.tokens = usage
+            config.add_tokens(tokens_turn, usage)
         except Exception as e:
             st.ok = False
             st.error = str(e)
+        except asyncio.CancelledError:
+            st.ok = False
+            st.error = "cancelled (quorum reached)"
+            raise
         finally:
-            st.ended_at = time.time()
+            st.ended_at = time.monotonic()
 
     tasks = [asyncio.create_task(_run_worker(i)) for i in range(config.N_WORKERS)]
+    quorum = min(config.SYNTH_QUORUM or config.N_WORKERS, config.N_WORKERS)
+
+    # The synthesizer row appears once synthesis starts
+    shown_synth: List[AgentState] = []
+
+    def _dashboard():
+        synth = shown_synth[0] if shown_synth else None
+        now = time.monotonic()  # one clock read per frame
+        return render_dashboard(states, synth, _compute_stats(states, synth, turn_start, tokens_turn, tokens_base, now), now)
+
+    def _drafts() -> Dict[str, str]:
+        return {st.name: (st.output_text or "") for st in states if st.ok}
 
-    # Live UI while workers run and synthesize
+    # Speculative synthesis: with every worker required, start synthesizing from
+    # N-1 drafts while the last worker finishes, to hide the slowest worker's latency.
+    # Its streamed deltas are held back (`held`) until we know the run will be kept.
+    speculate = config.SPECULATIVE_SYNTH and quorum == len(states) >= 3
+    held: List[str] | None = None
+    # Everything streamed to the terminal, i.e. what the user has seen of the answer
+    printed: List[str] = []
+
+    from rich.live import Live
+
+    # Live UI while workers run and synthesize; the dashboard is rebuilt on every refresh
     with Live(
-        render_dashboard(states, None, _compute_stats(states, None, turn_start, tokens_turn, tokens_base)),
+        get_renderable=_dashboard,
         console=console,
-        refresh_per_second=14
+        auto_refresh=True,
+        refresh_per_second=UI_REFRESH_PER_SEC,
     ) as live:
-        # Update while workers are running
-        while any(st.ok is None for st in states):
-            await asyncio.sleep(0.08)
-            live.update(render_dashboard(states, None, _compute_stats(states, None, turn_start, tokens_turn, tokens_base)))
-        await asyncio.gather(*tasks, return_exceptions=True)
 
-        # Start synthesizer and continuously refresh elapsed time while it runs
-        synth_state.started_at = time.time()
-        live.update(render_dashboard(states, synth_state, _compute_stats(states, synth_state, turn_start, tokens_turn, tokens_base)))
+        def _print_delta(delta: str) -> None:
+            # First token: freeze the dashboard and hand the terminal to the stream
+            if live.is_started:
+                live.stop()  # final repaint shows the synthesizer as streaming
+            console.out(delta, end="", highlight=False)
+            printed.append(delta)
+
+        def _on_synth_delta(delta: str) -> None:
+            if held is not None:
+                held.append(delta)
+                return
+            synth_state.deltas.append(delta)
+            _print_delta(delta)
+
+        def _release_held() -> None:
+            nonlocal held
+            chunks, held = held, None
+            if chunks:
+                if synth_state.ok is None:  # still streaming; a finished run already has its text
+                    synth_state.deltas.extend(chunks)
+                _print_delta("".join(chunks))
 
-        async def _do_synth():
+        def _show_synth() -> None:
+            if not shown_synth:
+                synth_state.started_at = time.monotonic()
+                shown_synth.append(synth_state)
+
+        async def _do_synth(drafts_map: Dict[str, str]):
             try:
-                drafts_map: Dict[str, str] = {st.name: (st.output_text or "") for st in states}
-                final, usage = await call_synth(client, history, drafts_map)
+                distinct = set(drafts_map.values())
+                if not config.WORKER_DIVERSITY and len(distinct) == 1:
+                    # Coalesced calls returned one shared draft: nothing to merge. With
+                    # independent sampling the synthesizer always runs, even on a single
+                    # draft (quorum 1 or one worker), so SYNTH_INSTRUCTION still applies
+                    synth_state.ok = True
+                    synth_state.output_text = distinct.pop()
+                    return
+                final, usage = await call_synth(client, history_prefix, drafts_map, on_delta=_on_synth_delta)
                 synth_state.ok = True
                 synth_state.output_text = final
-                async with token_lock:
-                    tokens_turn["input"]  += int(usage.get("input", 0))
-                    tokens_turn["output"] += int(usage.get("output", 0))
-                    tokens_turn["total"]  += int(usage.get("total", 0))
+                synth_state.tokens = usage
+                config.add_tokens(tokens_turn, usage)
             except Exception as e:
                 synth_state.ok = False
                 synth_state.error = str(e)
                 synth_state.output_text = ""
             finally:
-                synth_state.ended_at = time.time()
+                synth_state.ended_at = time.monotonic()
+
+        # Wake on each worker completion (no polling) and repaint right away;
+        # spinner/elapsed animation between completions is Live's refresh thread
+        spec_task: asyncio.Task | None = None
+        spec_drafts: Dict[str, str] = {}
+        pending = set(tasks)
+        while pending and sum(1 for st in states if st.ok) < quorum:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if speculate and spec_task is None and len(pending) == 1 and all(st.ok is not False for st in states):
+                spec_drafts = _drafts()
+                held = []
+                _show_synth()
+                spec_task = asyncio.create_task(_do_synth(spec_drafts))
+            live.refresh()
+
+        # Quorum reached: synthesize now rather than wait on the slowest worker. The
+        # stragglers are dropped, or left to finish after the answer (for the trace
+        # and token totals) when SYNTH_CANCEL_STRAGGLERS is off
+        if config.SYNTH_CANCEL_STRAGGLERS:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-        synth_task = asyncio.create_task(_do_synth())
-        while not synth_task.done():
-            await asyncio.sleep(0.08)
-            live.update(render_dashboard(states, synth_state, _compute_stats(states, synth_state, turn_start, tokens_turn, tokens_base)))
-        await synth_task
-        live.update(render_dashboard(states, synth_state, _compute_stats(states, synth_state, turn_start, tokens_turn, tokens_base)))
+        if spec_task is not None:
+            late = [st.output_text or "" for st in states if st.ok and st.name not in spec_drafts]
+            if late and _is_novel(late[0], spec_drafts.values()):
+                # The last draft adds material the speculative run hasn't seen: restart
+                spec_task.cancel()
+                await asyncio.gather(spec_task, return_exceptions=True)
+                spec_task = None
+                synth_state.ok = synth_state.error = synth_state.output_text = synth_state.ended_at = None
+                synth_state.deltas = []
+
+        if spec_task is not None:
+            if synth_state.ok is not False:
+                _release_held()
+            await spec_task
+        else:
+            held = None
+            _show_synth()
+            live.refresh()
+            await _do_synth(_drafts())
+
+        streamed = not live.is_started
+
+    if synth_state.ok is False:
+        # Keep only what was actually shown; the caller stores it (or nothing) as the answer
+        final_answer = "".join(printed).strip()
+        if streamed:
+            console.out("")
+        console.print(f"[red]Synthesis failed: {escape(synth_state.error or 'unknown error')}[/red]")
+    else:
+        final_answer = synth_state.output_text or ""
+        if streamed:
+            console.out("")
+        else:
+            print(final_answer)
+
+    stragglers = [t for t in tasks if not t.done()]
+    if stragglers:
+        console.print(f"[dim]Waiting for {len(stragglers)} remaining worker(s)…[/dim]")
+        await asyncio.gather(*stragglers, return_exceptions=True)
 
     # Update running totals in config after the turn completes
-    config.RUNNING_TOKENS["input"]  += tokens_turn.get("input", 0)
-    config.RUNNING_TOKENS["output"] += tokens_turn.get("output", 0)
-    config.RUNNING_TOKENS["total"]  += tokens_turn.get("total", 0)
+    config.add_tokens(config.RUNNING_TOKENS, tokens_turn)
 
     if config.LOG_ALL_TO_FILE:
-        try:
-            user_msg = next((m["content"] for m in reversed(history) if m["role"] == "user"), "")
-            trace = build_full_trace(user_msg, states, synth_state, history)
-            write_trace_to_file(trace)
-        except Exception:
-            pass
-
-    return synth_state.output_text or ""
+        # Built and written off the loop after the answer is shown; the caller
+        # appends to history next, so the trace gets its own copy
+        write_trace_in_background(get_last_user_content(history), states, synth_state, list(history))
+    return final_answer
@@ -0,0 +1,69 @@
+# File: multiworker/ratelimit.py
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+class AsyncRateLimiter:
+    """
+    Client-side gate for API calls:
+      - at most `max_concurrent` requests in flight (semaphore)
+      - optional requests-per-minute and tokens-per-minute budgets, refilled
+        continuously (token buckets); 0 disables a budget
+    Callers estimate a request's tokens up front and report the actual usage
+    afterwards, so the TPM budget tracks what the API really billed.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_concurrent: int = 8):
+        self.rpm = max(0, int(rpm))
+        self.tpm = max(0, int(tpm))
+        self._sem = asyncio.Semaphore(max(1, int(max_concurrent)))
+        self._budget_lock = asyncio.Lock()   # waiters for budget are served in order
+        self._req_bucket = float(self.rpm)
+        self._tok_bucket = float(self.tpm)
+        self._last_refill = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        dt = now - self._last_refill
+        self._last_refill = now
+        if self.rpm:
+            self._req_bucket = min(self.rpm, self._req_bucket + dt * self.rpm / 60.0)
+        if self.tpm:
+            self._tok_bucket = min(self.tpm, self._tok_bucket + dt * self.tpm / 60.0)
+
+    def _charge(self, est_tokens: int) -> int:
+        # A single request larger than the whole budget would never fit; cap it
+        return min(max(0, est_tokens), self.tpm) if self.tpm else 0
+
+    async def _wait_for_budget(self, est_tokens: int) -> None:
+        if not (self.rpm or self.tpm):
+            return
+        charge = self._charge(est_tokens)
+        async with self._budget_lock:
+            while True:
+                self._refill()
+                wait = 0.0
+                if self.rpm and self._req_bucket < 1.0:
+                    wait = max(wait, (1.0 - self._req_bucket) * 60.0 / self.rpm)
+                if self.tpm and self._tok_bucket < charge:
+                    wait = max(wait, (charge - self._tok_bucket) * 60.0 / self.tpm)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.rpm:
+                self._req_bucket -= 1.0
+            if self.tpm:
+                self._tok_bucket -= charge
+
+    @asynccontextmanager
+    async def slot(self, est_tokens: int = 0):
+        """Hold a concurrency slot for one request, after its RPM/TPM budget is available."""
+        async with self._sem:
+            await self._wait_for_budget(est_tokens)
+            yield
+
+    def record(self, est_tokens: int, actual_tokens: int) -> None:
+        """Correct the TPM budget by the difference between estimated and actual usage."""
+        if self.tpm:
+            self._tok_bucket -= max(0, int(actual_tokens)) - self._charge(est_tokens)
@@ -1,11 +1,32 @@
 # File: multiworker/sessions.py
+import asyncio
 import json
+from functools import lru_cache
 from typing import List, Optional, Tuple
 from . import config
 import re
 
+try:
+    import orjson  # optional: much faster (de)serialization of long histories
+except ImportError:
+    orjson = None
+
+_SLUG_RE = re.compile(r"[^a-zA-Z0-9_\-]+")
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)   # stdlib fallback, reused across saves
+
+@lru_cache(maxsize=256)
 def slug(name: str) -> str:
-    return re.sub(r"[^a-zA-Z0-9_\-]+", "_", name).strip("_") or "session"
+    return _SLUG_RE.sub("_", name).strip("_") or "session"
+
+def _dumps(payload: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_APPEND_NEWLINE)
+    return (_JSON_ENCODER.encode(payload) + "\n").encode("utf-8")
+
+def _loads(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
 
 def list_sessions() -> List[str]:
     return sorted([p.stem for p in config.SESS_DIR.glob("*.json")])
@@ -14,6 +35,7 @@ def save_session(name: str, history: list[dict], running_tokens: dict) -> str:
     """
     Save the current chat history AND running token totals to sessions/<name>.json
     running_tokens should be a dict like {"input": int, "output": int, "total": int}
+    Written compactly to a temp file and swapped in, so a crash never leaves a torn session.
     """
     fname = slug(name) + ".json"
     path = config.SESS_DIR / fname
@@ -25,8 +47,9 @@ def save_session(name: str, history: list[dict], running_tokens: dict) -> str:
             "total": int(running_tokens.get("total", 0)),
         },
     }
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(_dumps(payload))
+    tmp.replace(path)
     return str(path)
 
 def load_session(name: str) -> Optional[Tuple[list[dict], dict]]:
@@ -38,8 +61,7 @@ def load_session(name: str) -> Optional[Tuple[list[dict], dict]]:
     path = config.SESS_DIR / fname
     if not path.exists():
         return None
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = _loads(path.read_bytes())
 
     msgs_raw = data.get("messages", [])
     messages: list[dict] = []
@@ -55,3 +77,11 @@ def load_session(name: str) -> Optional[Tuple[list[dict], dict]]:
     }
 
     return messages, running_tokens
+
+async def asave_session(name: str, history: list[dict], running_tokens: dict) -> str:
+    """save_session() on a worker thread so disk I/O never stalls the event loop."""
+    return await asyncio.to_thread(save_session, name, list(history), dict(running_tokens))
+
+async def aload_session(name: str) -> Optional[Tuple[list[dict], dict]]:
+    """load_session() on a worker thread so disk I/O never stalls the event loop."""
+    return await asyncio.to_thread(load_session, name)
@@ -1,8 +1,12 @@
 # File: multiworker/settings_menu.py
-from .ui import console
+from .ui import console, ainput
 from . import config
 
-def settings_menu() -> None:
+async def _ask(prompt: str) -> str:
+    """Read one line without blocking the event loop; EOF reads as empty."""
+    return ((await ainput(prompt)) or "").strip()
+
+async def settings_menu() -> None:
     levels = ["minimal", "low", "medium", "high"]
     while True:
         console.print("\n[bold cyan]Settings[/bold cyan]")
@@ -12,25 +16,33 @@ def settings_menu() -> None:
         console.print(f"  3) Model: [bold]{config.CURRENT_MODEL}[/bold] (choices: {', '.join(config.MODEL_CHOICES)})")
         console.print(f"  4) Workers: [bold]{config.N_WORKERS}[/bold] (saved; restart to fully apply)")
         console.print(f"  5) Retry policy: max={config.RETRY_MAX}, delay={config.RETRY_DELAY_SEC}s")
-        console.print("  t) Toggle logging   r) Set reasoning   m) Set model   n) Set workers   q) Back\n")
+        quorum = config.SYNTH_QUORUM or "all"
+        console.print(f"  6) Synth quorum: [bold]{quorum}[/bold] (drafts needed before synthesis; 0 = all)")
+        div_status = "[green]ON[/green]" if config.WORKER_DIVERSITY else "[red]OFF[/red] (identical calls coalesced)"
+        console.print(f"  7) Independent worker sampling: {div_status}")
+        cache_status = "[green]ON[/green]" if config.CACHE_ENABLED else "[red]OFF[/red]"
+        console.print(f"  8) Replay identical requests from disk cache: {cache_status}")
+        console.print(f"  9) Max concurrent API requests: [bold]{config.MAX_CONCURRENCY}[/bold]")
+        console.print("  t) Toggle logging   r) Set reasoning   m) Set model   n) Set workers   k) Set quorum   d) Toggle sampling   c) Toggle cache   x) Set concurrency   q) Back\n")
 
-        choice = input("> ").strip().lower()
+        choice = (await _ask("> ")).lower()
         if choice in ("1", "t", "toggle"):
             config.LOG_ALL_TO_FILE = not config.LOG_ALL_TO_FILE
             config.save_settings()
             console.print(f"[green]Logging set to {'ON' if config.LOG_ALL_TO_FILE else 'OFF'} (saved)[/green]")
 
         elif choice in ("2", "r", "reasoning"):
-            new_level = input("Enter reasoning level (minimal|low|medium|high): ").strip().lower()
+            new_level = (await _ask("Enter reasoning level (minimal|low|medium|high): ")).lower()
             if new_level in levels:
                 config.REASONING_LEVEL = new_level
+                config.refresh_request_params()
                 config.save_settings()
                 console.print(f"[green]Reasoning set to {config.REASONING_LEVEL} (saved)[/green]")
             else:
                 console.print("[red]Invalid level.[/red]")
 
         elif choice in ("3", "m", "model"):
-            new_model = input(f"Enter model ({', '.join(config.MODEL_CHOICES)}): ").strip()
+            new_model = await _ask(f"Enter model ({', '.join(config.MODEL_CHOICES)}): ")
             if new_model in config.MODEL_CHOICES:
                 config.CURRENT_MODEL = new_model
                 config.save_settings()
@@ -40,7 +52,7 @@ def settings_menu() -> None:
 
         elif choice in ("n", "4", "workers"):
             try:
-                new_n = int(input("Enter number of workers (1-8): ").strip())
+                new_n = int(await _ask("Enter number of workers (1-8): "))
                 if 1 <= new_n <= 8:
                     config.N_WORKERS = new_n
                     # Regenerate names and persist immediately
@@ -52,5 +64,39 @@ def settings_menu() -> None:
             except Exception:
                 console.print("[red]Invalid number.[/red]")
 
+        elif choice in ("k", "6", "quorum"):
+            try:
+                new_q = int(await _ask("Enter synth quorum (0 = all workers, 1-8): "))
+                if 0 <= new_q <= 8:
+                    config.SYNTH_QUORUM = new_q
+                    config.save_settings()
+                    console.print(f"[green]Synth quorum set to {config.SYNTH_QUORUM or 'all'} (saved)[/green]")
+                else:
+                    console.print("[red]Value out of range (0-8).[/red]")
+            except Exception:
+                console.print("[red]Invalid number.[/red]")
+
+        elif choice in ("d", "7", "diversity"):
+            config.WORKER_DIVERSITY = not config.WORKER_DIVERSITY
+            config.save_settings()
+            console.print(f"[green]Independent worker sampling set to {'ON' if config.WORKER_DIVERSITY else 'OFF'} (saved)[/green]")
+
+        elif choice in ("c", "8", "cache"):
+            config.CACHE_ENABLED = not config.CACHE_ENABLED
+            config.save_settings()
+            console.print(f"[green]Response cache set to {'ON' if config.CACHE_ENABLED else 'OFF'} (saved)[/green]")
+
+        elif choice in ("x", "9", "concurrency"):
+            try:
+                new_c = int(await _ask("Enter max concurrent requests (1-16): "))
+                if 1 <= new_c <= 16:
+                    config.MAX_CONCURRENCY = new_c
+                    config.save_settings()
+                    console.print(f"[green]Max concurrent requests set to {config.MAX_CONCURRENCY} (saved)[/green]")
+                else:
+                    console.print("[red]Value out of range (1-16).[/red]")
+            except Exception:
+                console.print("[red]Invalid number.[/red]")
+
         elif choice in ("q", "b", "back", ""):
             break
@@ -1,19 +1,57 @@
 # File: multiworker/types.py
 from dataclasses import dataclass, field
 import time
-from typing import Optional
+from typing import Dict, List, Optional
 
-@dataclass
+@dataclass(slots=True)
 class AgentState:
     name: str
     model: str
-    started_at: float = field(default_factory=time.time)
+    started_at: float = field(default_factory=time.monotonic)   # monotonic clock: immune to wall-clock jumps
     ended_at: Optional[float] = None
     ok: Optional[bool] = None
     error: Optional[str] = None
-    output_text: Optional[str] = None
+    output_text: Optional[str] = None   # stripped final text once done
+    # Text deltas received so far while streaming; appended (never re-joined per token),
+    # the dashboard joins only the last few for its tail
+    deltas: List[str] = field(default_factory=list)
+    tokens: Optional[Dict[str, int]] = None   # usage of this agent's call
+
+    def elapsed_at(self, now: float) -> float:
+        """Elapsed seconds given a time.monotonic() reading shared by the caller."""
+        end = self.ended_at if self.ended_at else now
+        return max(0.0, end - self.started_at)
 
     @property
     def elapsed(self) -> float:
-        end = self.ended_at if self.ended_at else time.time()
-        return max(0.0, end - self.started_at)
+        return self.elapsed_at(time.monotonic())
+
+@dataclass(frozen=True, slots=True)
+class TurnStats:
+    """Live numbers for the dashboard footer, computed once per frame."""
+    elapsed: float = 0.0
+    workers_total: int = 0
+    workers_done: int = 0
+    workers_err: int = 0
+    workers_run: int = 0
+    worker_avg: float = 0.0
+    worker_max: float = 0.0
+    retries_total: int = 0
+    retry_events: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    # This turn so far
+    tokens_input: int = 0
+    tokens_output: int = 0
+    tokens_total: int = 0
+    # Running totals (baseline at turn start + this turn)
+    tokens_run_input: int = 0
+    tokens_run_output: int = 0
+    tokens_run_total: int = 0
+
+@dataclass(frozen=True)
+class PreparedRequest:
+    """A request built once and shared by several calls (see prepare_worker_request)."""
+    params: dict
+    key: str              # single-flight key
+    est_tokens: int = 0   # rough prompt size for the rate limiter
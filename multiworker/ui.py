@@ -1,85 +1,206 @@
 # File: multiworker/ui.py
-from rich.live import Live
-from rich.table import Table
+import asyncio
+import threading
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
 from rich.console import Console, Group
-from rich.panel import Panel
-from rich.spinner import Spinner
 from rich.text import Text
-from rich.align import Align
 
-from .types import AgentState
+from .types import AgentState, TurnStats
 from . import config
 
+if TYPE_CHECKING:
+    from rich.panel import Panel
+
+# Only the console is needed at startup; the dashboard widgets (table, panel,
+# spinner) are imported on the first render
 console = Console()
 
-def fmt_elapsed(sec: float) -> str:
-    return f"{int(sec//60):02d}:{int(sec%60):02d}"
+# How much of a streaming worker's partial draft the Status column shows
+STREAM_TAIL_CHARS = 80
 
-def _stats_footer(stats: dict) -> Panel:
+@lru_cache(maxsize=1)
+def _spinners():
     """
-    Compact stats footer panel.
-    Keys (all optional, default 0):
-      elapsed, workers_done, workers_err, workers_run, workers_total,
-      worker_avg, worker_max,
-      retries_total, retry_events,
-      tokens_input, tokens_output, tokens_total,            # this turn
-      tokens_run_input, tokens_run_output, tokens_run_total # running (Σ)
+    Shared spinner instances: a Spinner animates from its first render, so rebuilding
+    one per frame would pin it to frame 0 when the dashboard is re-rendered on refresh.
+    """
+    from rich.spinner import Spinner
+    return Spinner("dots", text=" running"), Spinner("bouncingBar", text=" synthesizing")
+
+@lru_cache(maxsize=64)
+def _status_cell(label: str, style: str) -> Text:
     """
+    Status cells for settled rows. A finished worker shows the same cell on every
+    frame, so it is built once; rendering never mutates a Text.
+    """
+    return Text(label, style=style)
+
+@lru_cache(maxsize=8)
+def _title(model: str, reasoning: str) -> Text:
+    """Dashboard title; fixed for a whole turn, so built once rather than per frame (Panel renders a copy)."""
+    return Text.assemble(
+        ("Multi-Worker Orchestrator", "bold"),
+        ("  (",),
+        (model, "cyan"),
+        (", reasoning=",),
+        (reasoning, "cyan"),
+        (")",),
+    )
+
+async def ainput(prompt: str = "") -> Optional[str]:
+    """
+    input() without blocking the event loop: the read runs on a daemon thread so
+    background tasks keep going while the user types. Returns None on EOF. A daemon
+    thread (not the default executor, which asyncio.run waits for on shutdown) lets
+    Ctrl-C exit at once instead of hanging until Enter is pressed.
+    """
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+
+    def _settle(line: Optional[str], err: Optional[BaseException]) -> None:
+        if fut.done():  # the awaiting task was cancelled
+            return
+        if err is not None:
+            fut.set_exception(err)
+        else:
+            fut.set_result(line)
+
+    def _read() -> None:
+        line, err = None, None
+        try:
+            line = input(prompt)
+        except EOFError:
+            pass
+        except Exception as e:
+            err = e
+        try:
+            loop.call_soon_threadsafe(_settle, line, err)
+        except RuntimeError:  # loop already closed (shutting down)
+            pass
+
+    threading.Thread(target=_read, name="ainput", daemon=True).start()
+    return await fut
+
+@lru_cache(maxsize=4096)
+def _fmt_seconds(s: int) -> str:
+    return f"{s//60:02d}:{s%60:02d}"
+
+def fmt_elapsed(sec: float) -> str:
+    # Whole seconds is all that is shown, so repeat frames hit the cache
+    return _fmt_seconds(int(sec))
+
+def _stats_footer(stats: TurnStats) -> "Panel":
+    """Compact stats footer panel (see types.TurnStats for the fields)."""
+    # Keyed by what is displayed (times at 1s resolution), so frames in between reuse the panel
+    return _footer_panel(
+        fmt_elapsed(stats.elapsed),
+        config.CURRENT_MODEL,
+        config.REASONING_LEVEL,
+        stats.workers_done,
+        stats.workers_total,
+        stats.workers_err,
+        stats.workers_run,
+        fmt_elapsed(stats.worker_avg),
+        fmt_elapsed(stats.worker_max),
+        stats.retries_total,
+        stats.retry_events,
+        (stats.cache_hits, stats.cache_misses) if config.CACHE_ENABLED else None,
+        (stats.tokens_input, stats.tokens_output, stats.tokens_total),
+        (stats.tokens_run_input, stats.tokens_run_output, stats.tokens_run_total),
+    )
+
+@lru_cache(maxsize=1)
+def _footer_panel(
+    elapsed: str, model: str, reasoning: str,
+    done: int, total: int, err: int, run: int, avg: str, mx: str,
+    retries: int, retry_events: int,
+    cache: tuple | None, turn: tuple, running: tuple,
+) -> "Panel":
+    """Build the footer from display values; rendering never mutates the Panel, so it is shared."""
+    from rich.panel import Panel
+    from rich.table import Table
+
     footer = Table.grid(expand=True)
     footer.add_column(ratio=1)
     footer.add_column(ratio=1)
-    footer.add_column(ratio=1)
+    footer.add_column(ratio=1, justify="right")   # justified by the column, no Align wrapper
 
     left = Text.assemble(
         ("Elapsed: ", "bold"),
-        fmt_elapsed(stats.get("elapsed", 0.0)),
+        elapsed,
         "   ",
         ("Model: ", "bold"),
-        f"{config.CURRENT_MODEL}",
+        model,
         "   ",
         ("Reasoning: ", "bold"),
-        f"{config.REASONING_LEVEL}",
+        reasoning,
     )
 
     mid = Text.assemble(
         ("Workers: ", "bold"),
-        f"{stats.get('workers_done', 0)}/{stats.get('workers_total', 0)} done",
-        f", {stats.get('workers_err', 0)} err",
-        f", {stats.get('workers_run', 0)} run",
+        f"{done}/{total} done",
+        f", {err} err",
+        f", {run} run",
         "   ",
         ("Avg: ", "bold"),
-        fmt_elapsed(stats.get("worker_avg", 0.0)),
+        avg,
         "   ",
         ("Max: ", "bold"),
-        fmt_elapsed(stats.get("worker_max", 0.0)),
+        mx,
     )
 
     # Tokens: show per-turn and cumulative Σ side by side
-    t_in  = stats.get("tokens_input", 0)
-    t_out = stats.get("tokens_output", 0)
-    t_tot = stats.get("tokens_total", 0)
-
-    r_in  = stats.get("tokens_run_input", 0)
-    r_out = stats.get("tokens_run_output", 0)
-    r_tot = stats.get("tokens_run_total", 0)
+    t_in, t_out, t_tot = turn
+    r_in, r_out, r_tot = running
 
     right = Text.assemble(
         ("Retries: ", "bold"),
-        f"{stats.get('retries_total', 0)}",
+        f"{retries}",
         "  (events ",
-        f"{stats.get('retry_events', 0)}",
+        f"{retry_events}",
         ")   ",
+    )
+    if cache is not None:
+        right.append_text(Text.assemble(
+            ("Cache: ", "bold"),
+            f"{cache[0]} hit / {cache[1]} miss   ",
+        ))
+    right.append_text(Text.assemble(
         ("Tokens ", "bold"),
         f"turn in:{t_in} / out:{t_out} / total:{t_tot}",
         "   ",
         ("Σ ", "bold"),
         f"in:{r_in} / out:{r_out} / total:{r_tot}",
-    )
+    ))
 
-    footer.add_row(left, mid, Align.right(right))
+    footer.add_row(left, mid, right)
     return Panel(footer, border_style="magenta", title="Stats", title_align="left")
 
-def render_dashboard(states: list[AgentState], synth: AgentState | None, stats: dict | None = None) -> Panel:
+def _recent_text(deltas: list[str], min_chars: int = 200) -> str:
+    """Join just enough of the latest deltas to cover `min_chars` characters."""
+    i, n = len(deltas), 0
+    while i and n < min_chars:
+        i -= 1
+        n += len(deltas[i])
+    return "".join(deltas[i:])
+
+def render_dashboard(
+    states: list[AgentState],
+    synth: AgentState | None,
+    stats: TurnStats | None = None,
+    now: float | None = None,
+) -> "Panel":
+    from rich.panel import Panel
+    from rich.table import Table
+
+    if now is None:
+        now = time.monotonic()
+
+    worker_spinner, synth_spinner = _spinners()
+
     # Main table
     tbl = Table(
         show_header=True,
@@ -94,36 +215,33 @@ def render_dashboard(states: list[AgentState], synth: AgentState | None, stats:
     tbl.add_column("Elapsed", no_wrap=True)
 
     for st in states:
-        if st.ok is None:
-            status_cell = Group(Spinner("dots", text=" running"))
+        deltas = st.deltas  # one read: a retry swaps in a fresh list
+        if st.ok is None and deltas:
+            # Streaming: show the tail of the partial draft on one line
+            tail = " ".join(_recent_text(deltas).split())[-STREAM_TAIL_CHARS:]
+            status_cell = Text(f" …{tail}", style="dim", no_wrap=True, overflow="ellipsis")
+        elif st.ok is None:
+            status_cell = worker_spinner
         elif st.ok:
-            status_cell = Text(" done ✓", style="green")
+            status_cell = _status_cell(" done ✓", "green")
         else:
-            status_cell = Text(f" error ✗ {st.error or ''}", style="red")
-        tbl.add_row(st.name, st.model, status_cell, fmt_elapsed(st.elapsed))
+            status_cell = _status_cell(f" error ✗ {st.error or ''}", "red")
+        tbl.add_row(st.name, st.model, status_cell, fmt_elapsed(st.elapsed_at(now)))
 
     if synth:
-        if synth.ok is None:
-            status_cell = Group(Spinner("bouncingBar", text=" synthesizing"))
+        if synth.ok is None and synth.deltas:
+            status_cell = _status_cell(" streaming answer ↓", "cyan")
+        elif synth.ok is None:
+            status_cell = synth_spinner
         elif synth.ok:
-            status_cell = Text(" finalizing ✓", style="green")
+            status_cell = _status_cell(" finalizing ✓", "green")
         else:
-            status_cell = Text(f" error ✗ {synth.error or ''}", style="red")
-        tbl.add_row(synth.name, synth.model, status_cell, fmt_elapsed(synth.elapsed))
+            status_cell = _status_cell(f" error ✗ {synth.error or ''}", "red")
+        tbl.add_row(synth.name, synth.model, status_cell, fmt_elapsed(synth.elapsed_at(now)))
 
-    title_text = Text.assemble(
-        ("Multi-Worker Orchestrator", "bold"),
-        ("  (",),
-        (f"{config.CURRENT_MODEL}", "cyan"),
-        (", reasoning=",),
-        (f"{config.REASONING_LEVEL}", "cyan"),
-        (")",),
-    )
+    title_text = _title(config.CURRENT_MODEL, config.REASONING_LEVEL)
 
-    # Group table + optional stats footer into one panel
-    if stats is not None:
-        content = Group(tbl, _stats_footer(stats))
-    else:
-        content = Group(tbl)
+    # Group table + optional stats footer into one panel; a lone table needs no Group
+    content = Group(tbl, _stats_footer(stats)) if stats is not None else tbl
 
     return Panel(content, title=title_text, border_style="cyan")